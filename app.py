@@ -1,44 +1,73 @@
-import pandas as pd
 import numpy as np
 from pathlib import Path
+import argparse
 import os
 
+from data_io import read_csv_cached
+
 # Set up data directory path
 DATA_DIR = Path(__file__).parent
 
-def load_and_inspect_data():
+CSV_FILES = {
+    'Drug Reviews': 'drug_reviews.csv',
+    'Patient Demographics': 'patient_demographics.csv',
+    'FAERS Signals': 'faers_signals.csv',
+    'Drug Indications': 'drug_indications.csv'
+}
+
+def _load_all():
+    """
+    Read every CSV once so verification and inspection share the same frames
+    """
+    print("📁 Loading CSV files...")
+    datasets = {}
+    errors = {}
+    for file in CSV_FILES.values():
+        file_path = DATA_DIR / file
+        if not file_path.exists():
+            continue
+        try:
+            datasets[file] = read_csv_cached(file_path)
+        except Exception as e:
+            errors[file] = e
+    return datasets, errors
+
+def load_and_inspect_data(datasets, verbose=False):
     """
-    Load all CSV files and perform initial data inspection
+    Perform initial data inspection on the loaded CSV files
+    
+    Args:
+        datasets (dict): Loaded frames keyed by CSV file name
+        verbose (bool): Pretty-print sample rows instead of plain records
     """
     print("🔧 Step 3: Loading and Inspecting Data")
     print("=" * 50)
     
     try:
-        # Load all CSV files
-        print("📁 Loading CSV files...")
-        drug_reviews = pd.read_csv(DATA_DIR / 'drug_reviews.csv')
-        patient_demo = pd.read_csv(DATA_DIR / 'patient_demographics.csv')
-        faers_signals = pd.read_csv(DATA_DIR / 'faers_signals.csv')
-        drug_indications = pd.read_csv(DATA_DIR / 'drug_indications.csv')
+        missing = [file for file in CSV_FILES.values() if file not in datasets]
+        if missing:
+            raise FileNotFoundError(f"Could not load: {missing}")
         
         print("✅ All files loaded successfully!")
         print()
         
         # Data inspection
-        datasets = {
-            'Drug Reviews': drug_reviews,
-            'Patient Demographics': patient_demo,
-            'FAERS Signals': faers_signals,
-            'Drug Indications': drug_indications
-        }
+        datasets = {name: datasets[file] for name, file in CSV_FILES.items()}
         
         for name, df in datasets.items():
+            shape = df.shape
+            columns = df.columns.tolist()
+            null_total = int(df.isna().values.sum())  # Single reduction over the ndarray
+            
             print(f"📊 {name}:")
-            print(f"   Shape: {df.shape}")
-            print(f"   Columns: {list(df.columns)}")
+            print(f"   Shape: {shape}")
+            print(f"   Columns: {columns}")
             print(f"   Sample data:")
-            print(df.head(3).to_string(index=False))
-            print(f"   Missing values: {df.isnull().sum().sum()}")
+            if verbose:
+                print(df.head(3).to_string(index=False))
+            else:
+                print(df.head(3).to_dict('records'))
+            print(f"   Missing values: {null_total}")
             print("-" * 50)
         
         return datasets
@@ -47,37 +76,30 @@ def load_and_inspect_data():
         print(f"❌ Error loading data: {e}")
         return None
 
-def verify_csv_format():
+def verify_csv_format(datasets, errors):
     """
     Verify CSV format and data integrity
     """
     print("🧼 Step 4: Verifying CSV Format and Data Integrity")
     print("=" * 50)
     
-    csv_files = [
-        'drug_reviews.csv',
-        'patient_demographics.csv', 
-        'faers_signals.csv',
-        'drug_indications.csv'
-    ]
-    
-    for file in csv_files:
-        file_path = DATA_DIR / file
-        if file_path.exists():
-            try:
-                df = pd.read_csv(file_path)
-                print(f"✅ {file}: Valid CSV format")
-                print(f"   - Rows: {len(df)}")
-                print(f"   - Columns: {len(df.columns)}")
-                print(f"   - Has headers: {'Yes' if not df.columns.str.contains('Unnamed').any() else 'No'}")
-                print(f"   - Empty rows: {df.isnull().all(axis=1).sum()}")
-            except Exception as e:
-                print(f"❌ {file}: Error - {e}")
+    for file in CSV_FILES.values():
+        if file in datasets:
+            df = datasets[file]
+            print(f"✅ {file}: Valid CSV format")
+            print(f"   - Rows: {len(df)}")
+            print(f"   - Columns: {len(df.columns)}")
+            # C engine names blank headers 'Unnamed: N', the pyarrow engine leaves them ''
+            unnamed = (df.columns == '') | df.columns.str.startswith('Unnamed')
+            print(f"   - Has headers: {'Yes' if not unnamed.any() else 'No'}")
+            print(f"   - Empty rows: {df.isnull().all(axis=1).sum()}")
+        elif file in errors:
+            print(f"❌ {file}: Error - {errors[file]}")
         else:
             print(f"❌ {file}: File not found")
         print()
 
-def main():
+def main(verbose=False):
     """
     Main function to run data loading and verification
     """
@@ -91,11 +113,14 @@ def main():
     print(f"   Data directory exists: {DATA_DIR.exists()}")
     print()
     
+    # Read each CSV once, then reuse the frames for every step
+    loaded, errors = _load_all()
+    
     # Step 2: Verify CSV format
-    verify_csv_format()
+    verify_csv_format(loaded, errors)
     
     # Step 3: Load and inspect data
-    datasets = load_and_inspect_data()
+    datasets = load_and_inspect_data(loaded, verbose=verbose)
     
     if datasets:
         print("🎉 Data loading completed successfully!")
@@ -107,4 +132,7 @@ def main():
         print("❌ Data loading failed. Please check file paths and formats.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Backend data processing pipeline")
+    parser.add_argument('--verbose', action='store_true', help="Pretty-print sample rows")
+    args = parser.parse_args()
+    main(verbose=args.verbose)
\ No newline at end of file
@@ -3,7 +3,11 @@
 Backend Health Monitor
 Monitors backend health and automatically restarts on failures
 """
+import psutil
+import random
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import subprocess
 import logging
@@ -11,6 +15,8 @@ import os
 import sys
 from pathlib import Path
 
+from service_health import wait_until_healthy
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,6 +27,9 @@ logging.basicConfig(
     ]
 )
 
+# Records the PID of the backend we spawned so restarts only touch that process tree
+PID_FILE = Path(__file__).parent / "backend.pid"
+
 class BackendMonitor:
     def __init__(self, api_url="http://localhost:5001", check_interval=30):
         self.api_url = api_url
@@ -29,37 +38,92 @@ class BackendMonitor:
         self.max_failures = 3
         self.backend_process = None
         
+        # Reuse one keep-alive connection for every health check
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=Retry(total=0))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+    @staticmethod
+    def is_healthy_response(response):
+        """Healthy means a 200 from /health with the model loaded"""
+        if response.status_code != 200:
+            return False
+        data = response.json()
+        return bool(data.get('model_loaded')) and data.get('status') == 'API is running'
+    
     def check_health(self):
         """Check if backend is responding"""
         try:
-            response = requests.get(f"{self.api_url}/health", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('model_loaded') and data.get('status') == 'API is running':
-                    logging.info("✅ Backend healthy")
-                    self.failure_count = 0
-                    return True
-                else:
-                    logging.warning("⚠️ Backend responding but model not loaded")
-                    return False
-            else:
+            response = self.session.get(f"{self.api_url}/health", timeout=10)
+            if response.status_code != 200:
                 logging.error(f"❌ Backend returned status {response.status_code}")
                 return False
-        except requests.exceptions.RequestException as e:
+            if self.is_healthy_response(response):
+                logging.info("✅ Backend healthy")
+                self.failure_count = 0
+                return True
+            else:
+                logging.warning("⚠️ Backend responding but model not loaded")
+                return False
+        except (requests.exceptions.RequestException, ValueError) as e:
             logging.error(f"❌ Backend connection failed: {e}")
             return False
     
+    def _tracked_backend(self):
+        """Return the backend we spawned as a psutil.Process, or None"""
+        # An unreaped Popen child keeps its PID, so it can't have been reused
+        if self.backend_process and self.backend_process.poll() is None:
+            try:
+                return psutil.Process(self.backend_process.pid)
+            except psutil.NoSuchProcess:
+                return None
+        
+        if not PID_FILE.exists():
+            return None
+        try:
+            pid, create_time = PID_FILE.read_text().split()
+            proc = psutil.Process(int(pid))
+        except (ValueError, psutil.NoSuchProcess):
+            return None
+        
+        # A PID left behind by a crashed run may now belong to an unrelated process
+        if abs(proc.create_time() - float(create_time)) > 0.01:
+            logging.warning(f"⚠️ PID {pid} was reused by another process, not signalling it")
+            return None
+        return proc
+    
     def kill_existing_processes(self):
-        """Kill existing backend processes"""
+        """Kill the tracked backend process and its children"""
         try:
-            if os.name == 'nt':  # Windows
-                # Kill processes by name
-                subprocess.run(["taskkill", "/f", "/im", "python.exe"], check=False, capture_output=True)
-                subprocess.run(["taskkill", "/f", "/im", "pythonw.exe"], check=False, capture_output=True)
-            else:  # Unix/Linux/Mac
-                subprocess.run(["pkill", "-f", "backend/api/app.py"], check=False)
+            parent = self._tracked_backend()
+            if parent is None:
+                PID_FILE.unlink(missing_ok=True)
+                logging.info("ℹ️ No tracked backend process to terminate")
+                return True
+            
+            try:
+                procs = parent.children(recursive=True) + [parent]
+            except psutil.NoSuchProcess:
+                procs = []
+            
+            for proc in procs:
+                try:
+                    proc.terminate()
+                except psutil.NoSuchProcess:
+                    pass
             
-            time.sleep(3)  # Wait for processes to terminate
+            # Returns as soon as the processes exit; escalate on survivors
+            _, alive = psutil.wait_procs(procs, timeout=5)
+            for proc in alive:
+                try:
+                    proc.kill()
+                except psutil.NoSuchProcess:
+                    pass
+            psutil.wait_procs(alive, timeout=5)
+            
+            PID_FILE.unlink(missing_ok=True)
+            self.backend_process = None
             logging.info("✅ Existing processes terminated")
             return True
         except Exception as e:
@@ -85,6 +149,17 @@ class BackendMonitor:
                     sys.executable, str(backend_path)
                 ])
             
+            # Store the start time too so a reused PID is never mistaken for ours
+            pid = self.backend_process.pid
+            try:
+                create_time = psutil.Process(pid).create_time()
+            except psutil.NoSuchProcess:
+                exit_code = self.backend_process.wait()
+                self.backend_process = None
+                PID_FILE.unlink(missing_ok=True)
+                logging.error(f"❌ Backend exited immediately with code {exit_code}")
+                return False
+            PID_FILE.write_text(f"{pid} {create_time!r}")
             logging.info(f"✅ Backend process started with PID: {self.backend_process.pid}")
             return True
             
@@ -92,36 +167,41 @@ class BackendMonitor:
             logging.error(f"❌ Failed to start backend: {e}")
             return False
     
+    def _wait_for_backend(self):
+        """Wait until the backend we just spawned reports healthy"""
+        return wait_until_healthy(
+            self.api_url, deadline_s=15, session=self.session,
+            is_healthy=self.is_healthy_response, process=self.backend_process
+        )
+    
     def restart_backend(self):
         """Restart the backend service"""
         logging.info("🔄 Attempting to restart backend...")
         try:
-            # Kill existing process
-            if self.backend_process:
-                try:
-                    self.backend_process.terminate()
-                    self.backend_process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    self.backend_process.kill()
-                except Exception as e:
-                    logging.warning(f"Could not terminate process: {e}")
-            
-            # Kill any other existing processes
+            # Kill the tracked backend process tree
             self.kill_existing_processes()
             
-            # Start new process
-            if self.start_backend():
-                # Wait for startup
-                time.sleep(15)
-                logging.info("✅ Backend restart completed")
-                return True
-            else:
-                return False
+            # Start new process, killing and retrying once if it never gets healthy
+            for attempt in range(2):
+                if not self.start_backend():
+                    return False
+                if self._wait_for_backend():
+                    logging.info("✅ Backend restart completed")
+                    return True
+                logging.warning(f"⚠️ Backend not healthy after restart attempt {attempt + 1}")
+                self.kill_existing_processes()
+            return False
                 
         except Exception as e:
             logging.error(f"❌ Failed to restart backend: {e}")
             return False
     
+    def _next_interval(self):
+        """Back off exponentially while failing, poll slowly while healthy, with jitter"""
+        if self.failure_count > 0:
+            return min(self.check_interval, 2 ** self.failure_count) * random.uniform(0.75, 1.25)
+        return self.check_interval * random.uniform(0.9, 1.1)
+    
     def monitor(self):
         """Main monitoring loop"""
         logging.info("🚀 Starting backend monitor...")
@@ -132,7 +212,9 @@ class BackendMonitor:
         if not self.check_health():
             logging.info("🔄 Backend not running, attempting to start...")
             if self.start_backend():
-                time.sleep(15)  # Wait for startup
+                # Wait for startup, but stop as soon as the backend answers
+                if not self._wait_for_backend():
+                    logging.warning("⚠️ Backend not healthy yet after initial start")
             else:
                 logging.error("❌ Failed to start backend initially")
         
@@ -155,23 +237,22 @@ class BackendMonitor:
                         logging.info("✅ Backend recovered, resetting failure count")
                         self.failure_count = 0
                 
-                time.sleep(self.check_interval)
+                time.sleep(self._next_interval())
                 
             except KeyboardInterrupt:
                 logging.info("🛑 Monitor stopped by user")
                 break
             except Exception as e:
                 logging.error(f"❌ Unexpected error in monitor loop: {e}")
-                time.sleep(self.check_interval)
+                time.sleep(self._next_interval())
     
     def cleanup(self):
         """Cleanup resources"""
         if self.backend_process:
-            try:
-                self.backend_process.terminate()
-                logging.info("✅ Backend process terminated")
-            except Exception as e:
-                logging.error(f"❌ Error terminating backend process: {e}")
+            self.kill_existing_processes()
+        # Never leave a stale PID behind for the next run to signal
+        PID_FILE.unlink(missing_ok=True)
+        self.session.close()
 
 if __name__ == "__main__":
     try:
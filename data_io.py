@@ -0,0 +1,94 @@
+import hashlib
+import pandas as pd
+from pathlib import Path
+
+# pyarrow's multi-threaded CSV parser is much faster than the default engine
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Prepared TabPFN dataset and the dtype contract shared by prep, training and prediction
+FINAL_DATA_PATH = Path('backend/data/final_data.parquet')
+FINAL_DATA_DTYPES = {
+    'sex': 'int8',
+    'age': 'int16',
+    'med': 'int8',
+    'dose': 'int16',
+    'time': 'int16',
+    'risk': 'int8'
+}
+
+# Explicit dtypes per CSV so columns come back narrow. The C engine uses them
+# instead of inferring; with engine='pyarrow' pandas 2.0 still infers and then
+# applies them as a post-parse astype, so there they only save memory.
+SCHEMAS = {
+    'patient_demographics.csv': {
+        'Age': 'int16',
+        'Sex': 'category',
+        'BP': 'category',
+        'Cholesterol': 'category',
+        'Na_to_K': 'float32',
+        'Drug': 'category'
+    },
+    'faers_signals.csv': {
+        'DRUGNAME_NORM': 'object',
+        'n_reports': 'int32'
+    },
+    'drug_reviews.csv': {
+        'Manufacturer': 'category',
+        'Excellent Review %': 'int8',
+        'Average Review %': 'int8',
+        'Poor Review %': 'int8'
+    },
+    'drug_indications.csv': {
+        'drug_rxcui': 'int32'
+    },
+    'medication_encoder.csv': {
+        'medication': 'object',
+        'encoded_value': 'int16'
+    }
+}
+
+def read_csv(path, **kwargs):
+    """Read a CSV with the pyarrow engine, falling back to pandas' default engine"""
+    kwargs.setdefault('dtype', SCHEMAS.get(Path(path).name))
+    if HAS_PYARROW:
+        return pd.read_csv(path, engine='pyarrow', **kwargs)
+    return pd.read_csv(path, **kwargs)
+
+def read_csv_cached(path, **kwargs):
+    """
+    Read a CSV, reusing a Parquet side-cache when it is newer than the CSV
+    
+    The cache file name carries a fingerprint of the schema, read options and
+    engine, so changing any of them invalidates caches written before.
+    """
+    path = Path(path)
+    options = {'dtype': SCHEMAS.get(path.name), **kwargs, 'pyarrow': HAS_PYARROW}
+    fingerprint = hashlib.sha1(repr(sorted(options.items())).encode()).hexdigest()[:12]
+    cache_path = path.with_name(f"{path.stem}.{fingerprint}.cache.parquet")
+    if cache_path.exists() and cache_path.stat().st_mtime >= path.stat().st_mtime:
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception:
+            pass  # Corrupt or unreadable cache, re-parse the CSV
+    
+    df = read_csv(path, **kwargs)
+    try:
+        # Drop caches written under an older schema or set of options
+        for stale in path.parent.glob(f"{path.stem}.*cache.parquet"):
+            stale.unlink(missing_ok=True)
+        df.to_parquet(cache_path, index=False)
+    except Exception:
+        pass  # Caching is best-effort (e.g. no Parquet engine installed)
+    return df
+
+def load_final_data(columns=None):
+    """
+    Load the prepared TabPFN dataset, reading only the requested columns
+    """
+    columns = list(columns or FINAL_DATA_DTYPES)
+    df = pd.read_parquet(FINAL_DATA_PATH, columns=columns)
+    return df.astype({col: FINAL_DATA_DTYPES[col] for col in columns})
@@ -1,22 +1,60 @@
 import joblib
+import os
+import threading
+import torch
+import types
 import numpy as np
 import pandas as pd
+from functools import lru_cache
 from pathlib import Path
 
+from data_io import read_csv
+
 # Load trained model with consistent paths
 MODEL_PATH = "backend/model/tabpfn_gender_aware_model.pkl"
 FALLBACK_MODEL_PATH = "backend/model/tabpfn_model.pkl"
 ENCODER_PATH = "backend/data/medication_encoder.csv"
 
+# Ensemble members per prediction; each one is a full transformer forward pass
+MAX_ENSEMBLE_CONFIGURATIONS = 4
+
+# Make sure intra-op parallelism uses every core in the serving process
+torch.set_num_threads(os.cpu_count() or 1)
+
+def _prepare_for_inference(model):
+    """Move a TabPFN classifier onto the GPU when available and cap its ensemble size"""
+    if torch.cuda.is_available() and hasattr(model, 'model'):
+        model.model[2].cuda()
+        model.device = 'cuda'
+    if hasattr(model, 'N_ensemble_configurations'):
+        model.N_ensemble_configurations = min(
+            model.N_ensemble_configurations, MAX_ENSEMBLE_CONFIGURATIONS
+        )
+    return model
+
+def _load_model_file(path):
+    """Load a pickled classifier, attaching mmap'd weights saved next to it"""
+    model = joblib.load(path)
+    weights_path = Path(path).with_name(f"{Path(path).stem}_weights.pt")
+    if weights_path.exists():
+        # Slim pickle: weights are demand-paged in rather than copied on load
+        state_dict = torch.load(weights_path, map_location='cpu', mmap=True)
+        model.model[2].load_state_dict(state_dict, assign=True)
+    elif hasattr(model, 'model') and any(p.is_meta for p in model.model[2].parameters()):
+        # Slim pickles hold no weight data; without the weights file they can't predict
+        raise FileNotFoundError(f"Model weights not found: {weights_path}")
+    return _prepare_for_inference(model)
+
+@lru_cache(maxsize=1)
 def load_model():
-    """Load the trained TabPFN model with fallback"""
+    """Load the trained TabPFN model with fallback (cached after first success)"""
     try:
         if Path(MODEL_PATH).exists():
-            model = joblib.load(MODEL_PATH)
+            model = _load_model_file(MODEL_PATH)
             print("✅ Primary model loaded successfully!")
             return model
         elif Path(FALLBACK_MODEL_PATH).exists():
-            model = joblib.load(FALLBACK_MODEL_PATH)
+            model = _load_model_file(FALLBACK_MODEL_PATH)
             print("✅ Fallback model loaded successfully!")
             return model
         else:
@@ -24,10 +62,16 @@ def load_model():
     except Exception as e:
         raise Exception(f"Error loading model: {e}")
 
+@lru_cache(maxsize=1)
 def load_medication_encoder():
-    """Load medication encoding mapping"""
+    """Load medication encoding mapping (cached, read-only)"""
+    # Read-only view so callers cannot mutate the shared cached mapping
+    return types.MappingProxyType(_read_medication_encoding())
+
+def _read_medication_encoding():
+    """Read medication encoding mapping from disk"""
     try:
-        encoder_df = pd.read_csv(ENCODER_PATH)
+        encoder_df = read_csv(ENCODER_PATH)
         return dict(zip(encoder_df['medication'], encoder_df['encoded_value']))
     except Exception as e:
         # Fallback encoding if file not found
@@ -46,68 +90,121 @@ def load_medication_encoder():
             "Atorvastatin": 10
         }
 
-# Global variables for model and encoder
-model = None
-medication_encoding = None
+@lru_cache(maxsize=1)
+def _medication_lookup():
+    """Categorical dtype whose codes index straight into the encoded values"""
+    encoding = load_medication_encoder()
+    med_cats = pd.CategoricalDtype(categories=list(encoding.keys()), ordered=False)
+    med_values = np.array(list(encoding.values()), dtype=np.int8)
+    return med_cats, med_values
+
+# Per-thread (1, 5) feature buffer reused by predict_risk, safe under threaded Flask
+_THREAD_STATE = threading.local()
+
+def _feature_buffer():
+    """Return this thread's reusable single-row feature buffer"""
+    buf = getattr(_THREAD_STATE, 'features', None)
+    if buf is None:
+        buf = _THREAD_STATE.features = np.empty((1, 5), dtype=np.float32)
+    return buf
+
+def _format_result(prob):
+    """Build the response dict for one risk probability"""
+    prob = float(prob)
+    return {
+        "risk_probability": round(prob, 3),
+        "risk_label": "HIGH RISK" if prob >= 0.5 else "LOW RISK",
+        "confidence": "High" if abs(prob - 0.5) > 0.3 else "Medium"
+    }
 
 def initialize():
-    """Initialize model and encoder"""
-    global model, medication_encoding
-    if model is None:
-        model = load_model()
-    if medication_encoding is None:
-        medication_encoding = load_medication_encoder()
+    """Load model and encoder into their caches"""
+    load_model()
+    _medication_lookup()
 
-def predict_risk(gender, age, medication, dose, duration):
+# Preload at import so the first request doesn't pay the joblib.load cost
+if __name__ != "__main__":
+    try:
+        initialize()
+    except Exception as e:
+        print(f"⚠️ Model preload failed, will retry on first prediction: {e}")
+
+def predict_risk_batch(genders, ages, medications, doses, durations, out=None):
     """
-    Predict drug risk for a patient
+    Predict drug risk for many patients with a single model call
     
     Args:
-        gender (str): 'Male' or 'Female'
-        age (int): Patient age
-        medication (str): Medication name
-        dose (int): Dose in mg
-        duration (int): Duration in days
+        genders (array-like of str): 'Male'/'Female' (or 'M'/'F') per patient
+        ages (array-like of int): Patient ages
+        medications (array-like of str): Medication names
+        doses (array-like of int): Doses in mg
+        durations (array-like of int): Durations in days
+        out (np.ndarray): Optional preallocated (N, 5) float32 buffer for the features
     
     Returns:
-        dict: Risk probability and label
+        list[dict]: Risk probability and label for each patient
     """
     try:
-        # Initialize if needed
-        initialize()
+        model = load_model()
+        medication_encoding = load_medication_encoder()
+        med_cats, med_values = _medication_lookup()
         
         # Encode gender (1 for Female, 0 for Male)
-        gender_encoded = 1 if gender.lower() in ['female', 'f'] else 0
+        genders = np.char.lower(np.asarray(genders, dtype=str))
+        gender_encoded = np.isin(genders, ['female', 'f']).astype(np.int8)
         
-        # Encode medication
-        med_encoded = medication_encoding.get(medication, -1)
-        if med_encoded == -1:
+        # Encode medication (unknown names get the -1 code)
+        med_codes = pd.Categorical(medications, dtype=med_cats).codes
+        if (med_codes == -1).any():
             available_meds = list(medication_encoding.keys())
             raise ValueError(f"Invalid medication. Available: {available_meds}")
+        med_encoded = med_values[med_codes]
         
-        # Create feature array
-        features = np.array([[gender_encoded, age, med_encoded, dose, duration]])
+        # Create feature matrix, casting each column to float32 exactly once
+        shape = (len(med_encoded), 5)
+        if out is None:
+            features = np.empty(shape, dtype=np.float32)
+        elif out.shape == shape and out.dtype == np.float32:
+            features = out
+        else:
+            raise ValueError(f"out must be a float32 array of shape {shape}")
+        features[:, 0] = gender_encoded
+        features[:, 1] = ages
+        features[:, 2] = med_encoded
+        features[:, 3] = doses
+        features[:, 4] = durations
         
-        # Make prediction
-        prob = model.predict_proba(features)[0][1]
-        prediction = model.predict(features)[0]
+        # Make prediction (one forward pass, label derived from probability)
+        with torch.inference_mode():
+            probs = model.predict_proba(features)[:, 1]
         
-        # Determine risk label
-        label = "HIGH RISK" if prediction == 1 else "LOW RISK"
-        
-        return {
-            "risk_probability": round(float(prob), 3),
-            "risk_label": label,
-            "confidence": "High" if abs(prob - 0.5) > 0.3 else "Medium"
-        }
+        return [_format_result(prob) for prob in probs]
         
     except Exception as e:
         raise Exception(f"Prediction error: {e}")
 
+def predict_risk(gender, age, medication, dose, duration):
+    """
+    Predict drug risk for a patient
+    
+    Args:
+        gender (str): 'Male' or 'Female'
+        age (int): Patient age
+        medication (str): Medication name
+        dose (int): Dose in mg
+        duration (int): Duration in days
+    
+    Returns:
+        dict: Risk probability and label
+    """
+    # Same encoding path as batches, filling this thread's reusable feature row
+    return predict_risk_batch(
+        [gender], [age], [medication], [dose], [duration], out=_feature_buffer()
+    )[0]
+
 def get_available_medications():
     """Get list of available medications"""
-    initialize()
-    return list(medication_encoding.keys())
+    return list(load_medication_encoder().keys())
 
 # Test function
 if __name__ == "__main__":
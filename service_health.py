@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Service health helpers
+Shared startup probes for the launcher and the backend monitor
+"""
+import random
+import time
+
+import requests
+
+def wait_until_healthy(url, deadline_s=15, session=None, is_healthy=None, process=None):
+    """
+    Poll `{url}/health` with jittered exponential backoff until it reports healthy
+    
+    Args:
+        url (str): Base URL of the service
+        deadline_s (float): Give up after this many seconds
+        session (requests.Session): Optional session to reuse connections
+        is_healthy (callable): Takes the /health response and returns a bool;
+            defaults to any 200 response
+        process (subprocess.Popen): Spawned service; stop waiting once it exits
+    
+    Returns:
+        bool: True once healthy, False if the deadline passed or the process exited
+    """
+    session = session or requests.Session()
+    is_healthy = is_healthy or (lambda response: response.status_code == 200)
+    deadline = time.monotonic() + deadline_s
+    attempt = 0
+    while True:
+        # A crashed service will never come up, and a 200 would be from someone else
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            if is_healthy(session.get(f"{url}/health", timeout=1)):
+                return True
+        except (requests.exceptions.RequestException, ValueError):
+            pass  # Not accepting connections yet, or not answering JSON
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        delay = 0.25 * 2 ** attempt * random.uniform(0.75, 1.25)
+        time.sleep(min(delay, remaining))
+        attempt += 1
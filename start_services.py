@@ -3,12 +3,34 @@
 Startup script for Drug Risk Prediction System
 Launches both backend API and frontend services
 """
+import select
+import signal
 import subprocess
 import time
 import sys
 import os
 from pathlib import Path
 
+from service_health import wait_until_healthy
+
+BACKEND_URL = "http://localhost:5001"
+
+def stop_process(process):
+    """Terminate a service, including its whole process group on Unix"""
+    if os.name == 'nt':
+        process.terminate()
+        return
+    try:
+        # Started with start_new_session=True, so the group id is the leader's PID;
+        # this still reaches surviving workers after the leader has been reaped
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass  # Whole group already exited
+
+def _request_shutdown(signum, frame):
+    """Route SIGTERM/SIGHUP through the same shutdown path as Ctrl+C"""
+    raise KeyboardInterrupt
+
 def start_backend():
     """Start the backend API service"""
     print("🚀 Starting Backend API...")
@@ -24,10 +46,10 @@ def start_backend():
             process = subprocess.Popen([
                 sys.executable, str(backend_path)
             ], creationflags=subprocess.CREATE_NEW_CONSOLE)
-        else:  # Unix/Linux/Mac
+        else:  # Unix/Linux/Mac, own session so shutdown can signal the whole group
             process = subprocess.Popen([
                 sys.executable, str(backend_path)
-            ])
+            ], start_new_session=True)
         
         print(f"✅ Backend started with PID: {process.pid}")
         return process
@@ -50,10 +72,10 @@ def start_frontend():
             process = subprocess.Popen([
                 sys.executable, str(frontend_path)
             ], creationflags=subprocess.CREATE_NEW_CONSOLE)
-        else:  # Unix/Linux/Mac
+        else:  # Unix/Linux/Mac, own session so shutdown can signal the whole group
             process = subprocess.Popen([
                 sys.executable, str(frontend_path)
-            ])
+            ], start_new_session=True)
         
         print(f"✅ Frontend started with PID: {process.pid}")
         return process
@@ -66,21 +88,34 @@ def main():
     print("🏥 Drug Risk Prediction System Startup")
     print("=" * 50)
     
+    # Wake up as soon as a child exits instead of polling (Unix only).
+    # The C-level handler writes to the wakeup pipe; the Python handler must
+    # take no locks, so it does nothing.
+    wakeup_r = None
+    if os.name != 'nt':
+        wakeup_r, wakeup_w = os.pipe()
+        os.set_blocking(wakeup_w, False)
+        signal.set_wakeup_fd(wakeup_w)
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+    
     # Start backend first
     backend_process = start_backend()
     if not backend_process:
         print("❌ Cannot continue without backend")
         return
     
-    # Wait for backend to start
+    # Wait for backend to start, proceeding as soon as it answers
     print("⏳ Waiting for backend to start...")
-    time.sleep(10)
+    if not wait_until_healthy(BACKEND_URL, deadline_s=15, process=backend_process):
+        print("❌ Backend did not become healthy")
+        stop_process(backend_process)
+        return
     
     # Start frontend
     frontend_process = start_frontend()
     if not frontend_process:
         print("❌ Failed to start frontend")
-        backend_process.terminate()
+        stop_process(backend_process)
         return
     
     print("\n🎉 Services started successfully!")
@@ -92,18 +127,33 @@ def main():
     print("💡 Keep this window open to monitor services")
     print("🛑 Press Ctrl+C to stop all services")
     
+    # The services run in their own sessions and no longer see terminal signals
+    if os.name != 'nt':
+        signal.signal(signal.SIGTERM, _request_shutdown)
+        signal.signal(signal.SIGHUP, _request_shutdown)
+    
     try:
         # Keep running and monitor processes
         while True:
-            time.sleep(5)
+            if os.name == 'nt':
+                time.sleep(5)
+            else:
+                select.select([wakeup_r], [], [])
+                os.read(wakeup_r, 512)  # Drain pending wakeups
             
             # Check if processes are still running
             if backend_process.poll() is not None:
                 print("❌ Backend process has stopped")
+                stop_process(backend_process)  # Any workers left in its group
+                stop_process(frontend_process)
+                print("✅ Frontend stopped")
                 break
                 
             if frontend_process.poll() is not None:
                 print("❌ Frontend process has stopped")
+                stop_process(frontend_process)  # Any workers left in its group
+                stop_process(backend_process)
+                print("✅ Backend stopped")
                 break
                 
     except KeyboardInterrupt:
@@ -111,11 +161,11 @@ def main():
         
         # Terminate processes
         if backend_process:
-            backend_process.terminate()
+            stop_process(backend_process)
             print("✅ Backend stopped")
             
         if frontend_process:
-            frontend_process.terminate()
+            stop_process(frontend_process)
             print("✅ Frontend stopped")
             
         print("👋 All services stopped")
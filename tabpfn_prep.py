@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from data_io import FINAL_DATA_DTYPES, FINAL_DATA_PATH, read_csv
+
 # Set up data directory path
 DATA_DIR = Path('backend/data')
 
@@ -15,8 +17,8 @@ def create_tabpfn_dataset():
     
     try:
         # Load datasets
-        patient_demo = pd.read_csv(DATA_DIR / 'patient_demographics.csv')
-        faers_signals = pd.read_csv(DATA_DIR / 'faers_signals.csv')
+        patient_demo = read_csv(DATA_DIR / 'patient_demographics.csv')
+        faers_signals = read_csv(DATA_DIR / 'faers_signals.csv')
         
         print("📊 Creating unified dataset...")
         
@@ -32,15 +34,31 @@ def create_tabpfn_dataset():
             'drugY': 'Atorvastatin'
         }
         
-        # Feature engineering
-        df['sex'] = df['Sex'].map({'M': 0, 'F': 1})  # Binary encoding
+        # Feature engineering (categorical codes give the encodings in one pass)
+        sex_cat = pd.Categorical(df['Sex'], categories=['M', 'F'])
+        if (sex_cat.codes == -1).any():
+            raise ValueError(f"Unmapped Sex values: {sorted(set(df['Sex'][sex_cat.codes == -1]))}")
+        df['sex'] = sex_cat.codes.astype(np.int8)  # Binary encoding
         df['age'] = df['Age']
-        df['med'] = df['Drug'].map(drug_mapping)
+        
+        # Encode medications numerically for TabPFN, ids follow drug_mapping order.
+        # Match case-insensitively: drug200 spells 'DrugY' but 'drugX' etc.
+        drug_cat = pd.Categorical(
+            df['Drug'].astype(str).str.lower(),
+            categories=[code.lower() for code in drug_mapping]
+        )
+        if (drug_cat.codes == -1).any():
+            unmapped = sorted(set(df['Drug'][drug_cat.codes == -1]))
+            raise ValueError(f"Drugs missing from drug_mapping: {unmapped}")
+        df['med'] = drug_cat.codes
+        med_encoder = {med: idx for idx, med in enumerate(drug_mapping.values())}
         
         # Add dose and time (simulated for demonstration)
-        np.random.seed(42)  # For reproducibility
-        df['dose'] = np.random.randint(10, 100, len(df))  # Random dose 10-100mg
-        df['time'] = np.random.randint(1, 30, len(df))    # Random time 1-30 days
+        # One draw for both columns, local generator so global RNG state is untouched
+        rng = np.random.default_rng(42)  # For reproducibility
+        block = rng.integers(low=[10, 1], high=[100, 30], size=(len(df), 2), dtype=np.int8)
+        df['dose'] = block[:, 0]  # Random dose 10-100mg
+        df['time'] = block[:, 1]  # Random time 1-30 days
         
         # Create risk labels based on FAERS signals and patient factors
         print("📈 Engineering risk labels...")
@@ -59,45 +77,29 @@ def create_tabpfn_dataset():
             'Atorvastatin': 'ATORVASTATIN'
         }
         
-        # Create balanced risk labels
-        def calculate_risk(row):
-            age = row['age']
-            bp = row['BP']
-            cholesterol = row['Cholesterol']
-            na_to_k = row['Na_to_K']
-            drug = row['Drug']
-            
-            # Calculate risk factors
-            risk_factors = 0
-            if age > 60: risk_factors += 1
-            if bp == 'HIGH': risk_factors += 1  
-            if cholesterol == 'HIGH': risk_factors += 1
-            if na_to_k > 25: risk_factors += 1
-            
-            # Drug-specific risk
-            high_risk_drugs = ['drugA', 'drugB']  # Aspirin, Ibuprofen
-            if drug in high_risk_drugs: risk_factors += 1
-            
-            # Final risk calculation (more balanced)
-            if risk_factors >= 3:
-                return 1
-            else:
-                return 0
-        
-        df['risk'] = df.apply(calculate_risk, axis=1)
+        # Create balanced risk labels (vectorized count of risk factors)
+        risk_factors = (df['age'].values > 60).astype(np.int8)
+        risk_factors += (df['BP'].values == 'HIGH')
+        risk_factors += (df['Cholesterol'].values == 'HIGH')
+        risk_factors += (df['Na_to_K'].values > 25)
+        
+        # Drug-specific risk
+        risk_factors += df['Drug'].isin(['drugA', 'drugB']).values  # Aspirin, Ibuprofen
+        
+        # Final risk calculation (more balanced)
+        df['risk'] = (risk_factors >= 3).astype(np.int8)
         
         # Select final columns for TabPFN
         final_columns = ['sex', 'age', 'med', 'dose', 'time', 'risk']
-        tabpfn_df = df[final_columns].copy()
-        
-        # Encode medication names numerically for TabPFN
-        med_encoder = {med: idx for idx, med in enumerate(tabpfn_df['med'].unique())}
-        tabpfn_df['med'] = tabpfn_df['med'].map(med_encoder)
+        tabpfn_df = df[final_columns].astype(FINAL_DATA_DTYPES)
         
         # Save the dataset
         output_path = DATA_DIR / 'final_data.csv'
         tabpfn_df.to_csv(output_path, index=False)
         
+        # Parquet keeps the narrow dtypes that a CSV roundtrip would widen to int64
+        tabpfn_df.to_parquet(FINAL_DATA_PATH, index=False, compression='zstd')
+        
         print(f"✅ TabPFN dataset created: {output_path}")
         print(f"📊 Dataset shape: {tabpfn_df.shape}")
         print(f"📋 Columns: {list(tabpfn_df.columns)}")
@@ -131,8 +133,9 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 
-# Load the prepared dataset
-final_data = pd.read_csv('backend/data/final_data.csv')
+# Load the prepared dataset (only the columns we need)
+final_data = pd.read_parquet('backend/data/final_data.parquet',
+                             columns=['sex', 'age', 'med', 'dose', 'time', 'risk'])
 
 # Separate features and target
 X = final_data[['sex', 'age', 'med', 'dose', 'time']]
@@ -169,7 +172,7 @@ if __name__ == "__main__":
         
         print("\n🎉 TabPFN Data Preparation Complete!")
         print("📋 Next steps:")
-        print("   ✅ final_data.csv ready for TabPFN")
+        print("   ✅ final_data.parquet ready for TabPFN")
         print("   ✅ Risk labels engineered from patient factors")
         print("   ✅ Features encoded for machine learning")
         print("   📊 Ready to train TabPFN classifier")
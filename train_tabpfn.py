@@ -1,9 +1,29 @@
 from tabpfn import TabPFNClassifier
-import pandas as pd
-from sklearn.model_selection import train_test_split
+import torch
+from sklearn.model_selection import StratifiedShuffleSplit
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import numpy as np
 
+from data_io import FINAL_DATA_PATH, load_final_data, read_csv
+
+# Cached train/test indices, reused until final_data.parquet is regenerated
+SPLIT_PATH = FINAL_DATA_PATH.with_name('split_indices.npz')
+
+def load_split_indices(X_arr, y_arr):
+    """
+    Return (train_idx, test_idx) for a stratified 80/20 split, cached on disk
+    """
+    if SPLIT_PATH.exists() and SPLIT_PATH.stat().st_mtime >= FINAL_DATA_PATH.stat().st_mtime:
+        cached = np.load(SPLIT_PATH)
+        train_idx, test_idx = cached['train_idx'], cached['test_idx']
+        if len(train_idx) + len(test_idx) == len(y_arr):
+            return train_idx, test_idx
+    
+    sss = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+    train_idx, test_idx = next(sss.split(X_arr, y_arr))
+    np.savez(SPLIT_PATH, train_idx=train_idx, test_idx=test_idx)
+    return train_idx, test_idx
+
 def train_tabpfn_model():
     """
     Train TabPFN model on the prepared dataset
@@ -14,7 +34,7 @@ def train_tabpfn_model():
     try:
         # Load the prepared dataset
         print("📊 Loading dataset...")
-        final_data = pd.read_csv('backend/data/final_data.csv')
+        final_data = load_final_data(['sex', 'age', 'med', 'dose', 'time', 'risk'])
         
         print(f"Dataset shape: {final_data.shape}")
         print(f"Risk distribution: {final_data['risk'].value_counts().to_dict()}")
@@ -26,17 +46,21 @@ def train_tabpfn_model():
         print(f"Features shape: {X.shape}")
         print(f"Target shape: {y.shape}")
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        # Split data (convert to NumPy once so sklearn doesn't re-convert)
+        X_arr = X.to_numpy(dtype=np.float32)
+        y_arr = y.to_numpy(dtype=np.int8)
+        train_idx, test_idx = load_split_indices(X_arr, y_arr)
+        X_train, X_test = X_arr[train_idx], X_arr[test_idx]
+        y_train, y_test = y_arr[train_idx], y_arr[test_idx]
         
         print(f"Training set: {X_train.shape}")
         print(f"Test set: {X_test.shape}")
         
         # Initialize and train TabPFN
         print("\n🔄 Training TabPFN classifier...")
-        classifier = TabPFNClassifier(device='cpu')
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        print(f"Using device: {device}")
+        classifier = TabPFNClassifier(device=device)
         classifier.fit(X_train, y_train)
         
         print("✅ Training completed!")
@@ -63,7 +87,7 @@ def train_tabpfn_model():
         print("-" * 30)
         
         # Load medication encoder for reference
-        med_encoder = pd.read_csv('backend/data/medication_encoder.csv')
+        med_encoder = read_csv('backend/data/medication_encoder.csv')
         print("Medication encoding:")
         print(med_encoder.to_string(index=False))
         
@@ -95,8 +119,23 @@ def train_tabpfn_model():
         model_dir = 'backend/model'
         os.makedirs(model_dir, exist_ok=True)
         
+        # Save on CPU so the model loads on any host; predict.py moves it to CUDA
+        transformer = classifier.model[2].cpu()
+        classifier.device = 'cpu'
+        
+        # Weights go to their own file so predict.py can mmap them; the pickle
+        # keeps only the architecture (on the meta device) and the fitted data
+        weights_path = f'{model_dir}/tabpfn_model_weights.pt'
+        state_dict = transformer.state_dict()
+        torch.save(state_dict, weights_path)
+        print(f"💾 Weights saved to: {weights_path}")
+        
         model_path = f'{model_dir}/tabpfn_model.pkl'
-        joblib.dump(classifier, model_path)
+        transformer.to('meta')
+        try:
+            joblib.dump(classifier, model_path)
+        finally:
+            transformer.load_state_dict(state_dict, assign=True)
         print(f"💾 Model saved to: {model_path}")
         
         return classifier, accuracy